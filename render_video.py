@@ -13,13 +13,18 @@ Triggered by GitHub Actions with payload:
 """
 
 import os
+import re
 import sys
 import json
+import math
 import asyncio
 import argparse
 import subprocess
 import tempfile
 import shutil
+import functools
+import hashlib
+import traceback
 import requests
 from pathlib import Path
 
@@ -34,12 +39,88 @@ VOICE = "en-US-ChristopherNeural"  # Deep male voice, great for stories
 # "en-US-JennyNeural" - Female
 # "en-GB-RyanNeural" - British male
 
+# Edge TTS always streams audio-24khz-48kbitrate-mono-mp3
+TTS_BITRATE = 48000
+# Encode the voiceover at its own 24 kHz mono layout so FFmpeg doesn't resample or
+# upmix it; 96k AAC is already well above what the 48k MP3 source carries
+AUDIO_ARGS = ['-c:a', 'aac', '-b:a', '96k', '-ar', '24000', '-ac', '1']
+# Synthesized voiceovers are cached by (voice, script) so reruns skip Edge TTS
+TTS_CACHE_DIR = os.environ.get('TTS_CACHE_DIR', os.path.expanduser('~/.cache/reddit2shorts/tts'))
+
 # Subtitle styling
 SUBTITLE_FONT = "Impact"
 SUBTITLE_FONTSIZE = 55
 SUBTITLE_PRIMARY_COLOR = "&H00FFFFFF"  # White
 SUBTITLE_OUTLINE_COLOR = "&H00000000"  # Black
 SUBTITLE_OUTLINE_WIDTH = 4
+SUBTITLE_MARGIN_V = 250
+SUBTITLE_CHUNK_SIZE = 6  # Words per subtitle line
+# Pre-rendered subtitles are transparent strips sitting on the bottom margin
+SUBTITLE_OVERLAY_HEIGHT = 400
+SUBTITLE_OVERLAY_Y = 1920 - SUBTITLE_MARGIN_V - SUBTITLE_OVERLAY_HEIGHT
+
+# Characters that would be read as ASS override tags
+_ASS_STRIP_TABLE = str.maketrans('', '', '\\{}')
+
+# ASS Header
+ASS_HEADER = f"""[Script Info]
+Title: Reddit Story Subtitles
+ScriptType: v4.00+
+PlayResX: 1080
+PlayResY: 1920
+WrapStyle: 0
+
+[V4+ Styles]
+Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding
+Style: Default,{SUBTITLE_FONT},{SUBTITLE_FONTSIZE},{SUBTITLE_PRIMARY_COLOR},&H000000FF,{SUBTITLE_OUTLINE_COLOR},&H00000000,-1,0,0,0,100,100,0,0,1,{SUBTITLE_OUTLINE_WIDTH},0,2,50,50,{SUBTITLE_MARGIN_V},1
+
+[Events]
+Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
+"""
+
+# Download I/O sizes - large reads keep downloads bandwidth-bound, not syscall-bound
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+DOWNLOAD_BUFFER_SIZE = 4 * 1024 * 1024
+
+# Google Drive file ID patterns
+_GDRIVE_D_RE = re.compile(r'/d/([a-zA-Z0-9_-]+)')
+_GDRIVE_ID_RE = re.compile(r'id=([a-zA-Z0-9_-]+)')
+
+# Google Drive upload chunk size (rclone buffers one chunk in memory)
+RCLONE_DRIVE_CHUNK_SIZE = "64M"
+
+# Video encoding
+# A hardware encoder is used when available, libx264 (CPU) otherwise.
+# RENDER_HWACCEL=auto|nvenc|vaapi|cpu restricts which hardware is tried.
+RENDER_HWACCEL = os.environ.get('RENDER_HWACCEL', 'auto').lower()
+VAAPI_DEVICE = os.environ.get('VAAPI_DEVICE', '/dev/dri/renderD128')
+# RENDER_ALLOW_COPY=1 stream-copies a 1080x1920 H.264 background when subtitles are soft
+RENDER_ALLOW_COPY = os.environ.get('RENDER_ALLOW_COPY') == '1'
+# Hardware encoders use their own rate-control knobs rather than x264's preset/CRF,
+# tuned for a 1080x1920 @ 30fps short
+NVENC_ARGS = [
+    '-c:v', 'h264_nvenc', '-preset', 'p4', '-tune', 'hq', '-profile:v', 'high',
+    '-rc', 'vbr', '-cq', '23', '-b:v', '0', '-maxrate', '8M', '-bufsize', '16M',
+    '-spatial_aq', '1', '-temporal_aq', '1', '-rc-lookahead', '20'
+]
+# NVDEC decoders that can crop and resize while decoding, by ffprobe codec name
+CUVID_DECODERS = {'h264': 'h264_cuvid', 'hevc': 'hevc_cuvid'}
+VAAPI_ARGS = ['-c:v', 'h264_vaapi', '-rc_mode', 'CQP', '-qp', '23', '-compression_level', '1']
+# libx264 uses every core (-threads 0); override the preset with FFMPEG_PRESET
+X264_PRESET = os.environ.get('FFMPEG_PRESET', 'superfast')
+# ultrafast/superfast/veryfast already look ahead 10 frames or fewer; cap the slower presets there
+X264_LOOKAHEAD_ARGS = [] if X264_PRESET in ('ultrafast', 'superfast', 'veryfast') else ['-x264-params', 'rc-lookahead=10']
+X264_ARGS = [
+    '-c:v', 'libx264', '-preset', X264_PRESET, '-crf', '22',
+    '-threads', '0', *X264_LOOKAHEAD_ARGS, '-pix_fmt', 'yuv420p'
+]
+# Sources that are already 1080x1920-ready only need the subtitles burned in
+X264_PASSTHROUGH_ARGS = ['-c:v', 'libx264', '-preset', 'ultrafast', '-crf', '18', '-threads', '0', '-pix_fmt', 'yuv420p']
+HWENC_CACHE_PATH = os.path.expanduser('~/.cache/reddit2shorts/hwenc_ok.json')
+
+# One pooled HTTP session for every download and upload, so connections
+# (and their TLS handshakes) are reused instead of opened per request
+HTTP_SESSION = requests.Session()
 
 
 def upload_to_catbox(file_path: str) -> str:
@@ -56,7 +137,13 @@ def upload_to_catbox(file_path: str) -> str:
             'reqtype': 'fileupload'
         }
         
-        response = requests.post(url, files=files, data=data)
+        try:
+            # Stream the multipart body from disk instead of building it in memory
+            from requests_toolbelt.multipart.encoder import MultipartEncoder
+            encoder = MultipartEncoder(fields={**data, **files})
+            response = HTTP_SESSION.post(url, data=encoder, headers={'Content-Type': encoder.content_type})
+        except ImportError:
+            response = HTTP_SESSION.post(url, files=files, data=data)
         response.raise_for_status()
         
         # Catbox returns the direct URL as plain text
@@ -76,20 +163,25 @@ def upload_to_gdrive(file_path: str, folder_path: str = "Reddit Stories Shorts")
     filename = os.path.basename(file_path)
     remote_path = f"vk889900:{folder_path}/{filename}"
     
-    # Upload using rclone
+    # Upload using rclone, in chunks large enough that a typical short
+    # goes up in a single resumable request instead of many 8 MB ones.
+    # Drive only accepts a resumable upload's chunks in order, so one file
+    # can't be split across parallel connections - chunk size is the lever.
     cmd = [
         'rclone', 'copyto',
         file_path,
         remote_path,
+        '--drive-chunk-size', RCLONE_DRIVE_CHUNK_SIZE,
         '-v'
     ]
     
     print(f"  Running: rclone copyto to {remote_path}")
-    result = subprocess.run(cmd, capture_output=True, text=True)
+    result = subprocess.run(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
     
     if result.returncode != 0:
-        print(f"  rclone error: {result.stderr}")
-        raise RuntimeError(f"Failed to upload to Google Drive: {result.stderr}")
+        error = result.stderr.decode(errors='replace')
+        print(f"  rclone error: {error}")
+        raise RuntimeError(f"Failed to upload to Google Drive: {error}")
     
     print(f"  Upload complete!")
     
@@ -118,268 +210,638 @@ def upload_to_gdrive(file_path: str, folder_path: str = "Reddit Stories Shorts")
     return remote_path
 
 
-async def generate_tts(script: str, output_path: str) -> str:
-    """Generate text-to-speech using Edge TTS (FREE)."""
-    print(f"  Using voice: {VOICE}")
+async def generate_tts(script: str, log=print) -> tuple:
+    """Generate text-to-speech using Edge TTS (FREE), streamed into memory.
     
-    communicate = edge_tts.Communicate(script, VOICE)
-    await communicate.save(output_path)
+    Returns the MP3 bytes and the (start, duration, word) timings in seconds.
+    Progress goes through log, so a short prepared alongside another can tag its lines.
+    """
+    log(f"  Using voice: {VOICE}")
     
-    size_kb = os.path.getsize(output_path) / 1024
-    print(f"  Generated: {output_path} ({size_kb:.1f} KB)")
-    return output_path
+    cache_key = hashlib.sha256(f"{VOICE}\0{script}".encode('utf-8')).hexdigest()
+    audio_cache_path = os.path.join(TTS_CACHE_DIR, f"{cache_key}.mp3")
+    timings_cache_path = os.path.join(TTS_CACHE_DIR, f"{cache_key}.json")
+    
+    # The timings file is written last, so its presence means the entry is complete
+    if os.path.exists(timings_cache_path):
+        try:
+            with open(audio_cache_path, 'rb') as f:
+                audio_data = f.read()
+            with open(timings_cache_path, encoding='utf-8') as f:
+                word_timings = [tuple(timing) for timing in json.load(f)]
+            log(f"  Using cached voiceover: {len(audio_data) / 1024:.1f} KB, {len(word_timings)} word timings")
+            return audio_data, word_timings
+        except (OSError, ValueError):
+            pass
+    
+    communicate = edge_tts.Communicate(script, VOICE, boundary="WordBoundary")
+    audio_chunks = []
+    word_timings = []
+    async for chunk in communicate.stream():
+        if chunk["type"] == "audio":
+            audio_chunks.append(chunk["data"])
+        elif chunk["type"] == "WordBoundary":
+            # Offsets and durations are in 100-nanosecond ticks
+            word_timings.append((chunk["offset"] / 1e7, chunk["duration"] / 1e7, chunk["text"]))
+    
+    audio_data = b"".join(audio_chunks)
+    size_kb = len(audio_data) / 1024
+    log(f"  Generated: {size_kb:.1f} KB of audio, {len(word_timings)} word timings")
+    
+    try:
+        os.makedirs(TTS_CACHE_DIR, exist_ok=True)
+        with open(audio_cache_path, 'wb') as f:
+            f.write(audio_data)
+        with open(timings_cache_path, 'w', encoding='utf-8') as f:
+            json.dump(word_timings, f)
+    except OSError as e:
+        log(f"  Could not cache voiceover: {e}")
+    
+    return audio_data, word_timings
 
 
-def download_video(video_url: str, output_path: str) -> str:
-    """Download a video from Google Drive (via rclone) or direct URL."""
-    print(f"  Downloading: {video_url[:60]}...")
+def download_video(video_url: str, output_path: str, log=print) -> str:
+    """Download a video from Google Drive (via rclone) or direct URL, reporting progress through log."""
+    log(f"  Downloading: {video_url[:60]}...")
     
     # Check if it's a Google Drive link
     if 'drive.google.com' in video_url:
         # Extract file ID from various Google Drive URL formats
-        import re
-        
         # Match patterns like /d/FILE_ID/ or id=FILE_ID
-        match = re.search(r'/d/([a-zA-Z0-9_-]+)', video_url)
+        match = _GDRIVE_D_RE.search(video_url)
         if not match:
-            match = re.search(r'id=([a-zA-Z0-9_-]+)', video_url)
+            match = _GDRIVE_ID_RE.search(video_url)
         
         if not match:
             raise RuntimeError(f"Could not extract file ID from Google Drive URL: {video_url}")
         
         file_id = match.group(1)
-        print(f"  Google Drive file ID: {file_id}")
-        
-        # Use rclone to download from Google Drive
-        # rclone must be configured with 'gdrive' remote
-        rclone_path = f"vk889900:{{{{ id={file_id} }}}}"
-        
-        cmd = [
-            'rclone', 'copyto',
-            '--drive-shared-with-me',
-            f':drive,team_drive=:{{id={file_id}}}',
-            output_path
-        ]
+        log(f"  Google Drive file ID: {file_id}")
         
-        # Alternative simpler approach using rclone backend command
+        # Use rclone to download from Google Drive, streaming the file straight
+        # into output_path so its original name never matters
         cmd = [
-            'rclone', 'copyurl',
-            f'https://drive.google.com/uc?export=download&id={file_id}',
-            output_path,
-            '--auto-filename=false'
-        ]
-        
-        # Best approach: use rclone with Google Drive backend
-        cmd = [
-            'rclone', 'copy',
+            'rclone', 'cat',
             f'vk889900:{{id={file_id}}}',
-            os.path.dirname(output_path),
-            '--drive-acknowledge-abuse',
-            '-v'
+            '--drive-acknowledge-abuse'
         ]
         
-        print(f"  Running rclone...")
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        log(f"  Running rclone...")
+        with open(output_path, 'wb') as f:
+            result = subprocess.run(cmd, stdin=subprocess.DEVNULL, stdout=f, stderr=subprocess.PIPE)
         
         if result.returncode != 0:
-            print(f"  rclone error: {result.stderr}")
+            log(f"  rclone error: {result.stderr.decode(errors='replace')}")
             # Try alternative: direct download with confirmation bypass
-            print("  Trying direct download with gdown...")
+            log("  Trying direct download with gdown...")
             try:
                 import gdown
-                gdown.download(id=file_id, output=output_path, quiet=False)
+                gdown.download(id=file_id, output=output_path, quiet=True)
             except ImportError:
-                # Fall back to requests with cookies
-                session = requests.Session()
-                response = session.get(f'https://drive.google.com/uc?id={file_id}&export=download')
+                # Fall back to requests with cookies; stream so a file that needs no
+                # confirmation isn't read into memory in one piece
+                response = HTTP_SESSION.get(f'https://drive.google.com/uc?id={file_id}&export=download', stream=True)
                 
                 # Check for confirmation token
                 for key, value in response.cookies.items():
                     if key.startswith('download_warning'):
-                        response = session.get(
+                        response.close()
+                        response = HTTP_SESSION.get(
                             f'https://drive.google.com/uc?id={file_id}&export=download&confirm={value}',
                             stream=True
                         )
                         break
                 
-                with open(output_path, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        f.write(chunk)
-        else:
-            # rclone downloads to a file named by the original filename
-            # We need to rename it to our expected output path
-            downloaded_files = os.listdir(os.path.dirname(output_path))
-            for f in downloaded_files:
-                if f.endswith('.mp4') and f != os.path.basename(output_path):
-                    src = os.path.join(os.path.dirname(output_path), f)
-                    shutil.move(src, output_path)
-                    break
+                with open(output_path, 'wb', buffering=DOWNLOAD_BUFFER_SIZE) as f:
+                    response.raw.decode_content = True
+                    shutil.copyfileobj(response.raw, f, DOWNLOAD_CHUNK_SIZE)
     else:
         # Direct URL download (Catbox, etc.)
-        response = requests.get(video_url, stream=True)
+        response = HTTP_SESSION.get(video_url, stream=True)
         response.raise_for_status()
         
         total_size = int(response.headers.get('content-length', 0))
+        # Live progress only helps on a terminal; in CI it just floods the log
+        show_progress = total_size > 0 and sys.stdout.isatty()
         
-        with open(output_path, 'wb') as f:
-            downloaded = 0
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-                downloaded += len(chunk)
-                if total_size > 0:
-                    percent = (downloaded / total_size) * 100
-                    print(f"\r  Progress: {percent:.1f}%", end='', flush=True)
-        
-        print()  # New line after progress
+        with open(output_path, 'wb', buffering=DOWNLOAD_BUFFER_SIZE) as f:
+            if show_progress:
+                downloaded = 0
+                last_percent = -1
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    f.write(chunk)
+                    downloaded += len(chunk)
+                    percent = downloaded * 100 // total_size
+                    if percent != last_percent:
+                        log(f"  Progress: {percent}%", end='\r', flush=True)
+                        last_percent = percent
+                print()  # New line after progress
+            else:
+                # Copy straight from the underlying urllib3 stream
+                response.raw.decode_content = True
+                shutil.copyfileobj(response.raw, f, DOWNLOAD_CHUNK_SIZE)
     
     size_mb = os.path.getsize(output_path) / (1024 * 1024)
-    print(f"  Downloaded: {output_path} ({size_mb:.1f} MB)")
+    log(f"  Downloaded: {output_path} ({size_mb:.1f} MB)")
     return output_path
 
 
-def get_audio_duration(audio_path: str) -> float:
-    """Get the duration of an audio file using ffprobe."""
-    cmd = [
-        'ffprobe', '-v', 'error',
-        '-show_entries', 'format=duration',
-        '-of', 'default=noprint_wrappers=1:nokey=1',
-        audio_path
-    ]
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    return float(result.stdout.strip())
+def get_audio_duration(audio_data: bytes, word_timings: list = None) -> float:
+    """Get the duration of Edge TTS audio without probing it.
+    
+    The size of the constant bitrate MP3 gives the full length including trailing
+    silence; the end of the last spoken word is a lower bound in case the stream
+    format ever changes.
+    """
+    duration = len(audio_data) * 8 / TTS_BITRATE
+    if word_timings:
+        last_start, last_duration, _ = word_timings[-1]
+        duration = max(duration, last_start + last_duration)
+    return duration
 
 
-def get_video_dimensions(video_path: str) -> tuple:
-    """Get video width and height."""
+def probe_media(video_path: str) -> dict:
+    """Get video width, height, codec and duration with a single ffprobe call."""
     cmd = [
         'ffprobe', '-v', 'error',
         '-select_streams', 'v:0',
-        '-show_entries', 'stream=width,height',
-        '-of', 'csv=p=0',
+        '-show_entries', 'stream=width,height,codec_name:format=duration',
+        '-print_format', 'json',
         video_path
     ]
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    width, height = map(int, result.stdout.strip().split(','))
-    return width, height
+    result = subprocess.run(cmd, stdin=subprocess.DEVNULL, capture_output=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffprobe failed: {result.stderr.decode(errors='replace')}")
+    
+    info = json.loads(result.stdout)
+    stream = info['streams'][0]
+    return {
+        'width': int(stream['width']),
+        'height': int(stream['height']),
+        'codec': stream.get('codec_name', ''),
+        'duration': float(info.get('format', {}).get('duration', 0)),
+    }
+
+
+def _chunks_from_word_timings(word_timings: list, audio_duration: float) -> list:
+    """Group Edge TTS word timings into (start, end, text) subtitle chunks."""
+    chunks = []
+    for i in range(0, len(word_timings), SUBTITLE_CHUNK_SIZE):
+        chunk_words = word_timings[i:i + SUBTITLE_CHUNK_SIZE]
+        start_time = chunk_words[0][0]
+        
+        # Keep each chunk on screen until the next one is spoken
+        if i + SUBTITLE_CHUNK_SIZE < len(word_timings):
+            end_time = word_timings[i + SUBTITLE_CHUNK_SIZE][0]
+        else:
+            end_time = audio_duration
+        
+        chunks.append((start_time, end_time, ' '.join(word for _, _, word in chunk_words)))
+    
+    return chunks
 
 
-def generate_subtitles_from_script(script: str, audio_duration: float, output_dir: str) -> str:
-    """Generate ASS subtitles from the script text with estimated timing."""
-    import re
+def _chunks_from_script(script: str, audio_duration: float) -> list:
+    """Split the script into (start, end, text) subtitle chunks with estimated timing."""
+    # Without word timings, assume an even speaking rate across the whole script
+    words = script.split()
+    num_chunks = -(-len(words) // SUBTITLE_CHUNK_SIZE)
+    time_per_chunk = audio_duration / max(1, num_chunks)
     
-    ass_path = os.path.join(output_dir, "subtitles.ass")
+    return [
+        (i * time_per_chunk, (i + 1) * time_per_chunk,
+         ' '.join(words[i * SUBTITLE_CHUNK_SIZE:(i + 1) * SUBTITLE_CHUNK_SIZE]))
+        for i in range(num_chunks)
+    ]
+
+
+def _find_subtitle_font() -> tuple:
+    """Resolve the bold SUBTITLE_FONT to a font file through fontconfig.
+    
+    Returns the font file and whether it needs a synthetic bold (no real bold
+    face), or None. fc-match always answers with its closest substitute, so
+    anything that isn't actually SUBTITLE_FONT returns None and libass does the
+    font fallback instead.
+    """
+    try:
+        result = subprocess.run(
+            ['fc-match', '--format=%{family}\n%{weight}\n%{file}', f"{SUBTITLE_FONT}:bold"],
+            capture_output=True, text=True
+        )
+    except FileNotFoundError:
+        return None
+    
+    family, weight, font_file = (result.stdout.split('\n', 2) + ['', ''])[:3]
+    if result.returncode != 0 or not os.path.isfile(font_file):
+        return None
+    if SUBTITLE_FONT.lower() not in (name.strip().lower() for name in family.split(',')):
+        return None
+    
+    # fontconfig's FC_WEIGHT_BOLD is 200; variable fonts report a range
+    weight_match = re.search(r'\d+', weight)
+    return font_file, not weight_match or int(weight_match.group()) < 200
+
+
+def _wrap_subtitle_text(draw, text: str, font, max_width: int) -> list:
+    """Greedily wrap text onto as few lines as fit within max_width."""
+    lines = []
+    current_line = ""
+    for word in text.split():
+        candidate = f"{current_line} {word}".strip()
+        if current_line and draw.textlength(candidate, font=font) > max_width:
+            lines.append(current_line)
+            current_line = word
+        else:
+            current_line = candidate
+    lines.append(current_line)
+    return lines
+
+
+def render_subtitle_overlays(chunks: list, output_dir: str) -> str:
+    """Rasterize each subtitle chunk once and list the PNGs for FFmpeg's concat demuxer.
+    
+    Returns None when Pillow or the subtitle font is unavailable, in which case
+    the ASS file is burned in with libass instead.
+    """
+    try:
+        from PIL import Image, ImageDraw, ImageFont
+    except ImportError:
+        return None
+    
+    subtitle_font = _find_subtitle_font()
+    if not subtitle_font:
+        return None
+    font_file, synthetic_bold = subtitle_font
+    
+    # libass sizes fonts by ascender + descender height rather than by em size
+    ascent, descent = ImageFont.truetype(font_file, 1000).getmetrics()
+    font = ImageFont.truetype(font_file, round(SUBTITLE_FONTSIZE * 1000 / (ascent + descent)))
+    ascent, descent = font.getmetrics()
+    line_height = ascent + descent
+    # Without a bold face libass widens the glyphs by 1/64 em for Bold=-1; a stroke
+    # in the text colour of half that on each side does the same
+    bold_width = font.size / 128 if synthetic_bold else 0
+    size = (1080, SUBTITLE_OVERLAY_HEIGHT)
+    Image.new('RGBA', size).save(os.path.join(output_dir, "sub_blank.png"))
+    
+    entries = ["ffconcat version 1.0\n"]
+    current_time = 0.0
+    for index, (start_time, end_time, chunk_text) in enumerate(chunks):
+        # Fill any gap before this chunk with a transparent frame
+        if start_time > current_time:
+            entries.append(f"file sub_blank.png\nduration {start_time - current_time:.3f}\n")
+        
+        image = Image.new('RGBA', size)
+        draw = ImageDraw.Draw(image)
+        lines = _wrap_subtitle_text(draw, chunk_text.upper(), font, size[0] - 100)
+        # Lines are placed individually so the outline and text passes line up;
+        # Pillow's multiline spacing changes with the stroke width. All outlines
+        # go down first so no line's outline covers its neighbour's text.
+        for stroke_width, stroke_fill in ((SUBTITLE_OUTLINE_WIDTH + bold_width, 'black'), (bold_width, 'white')):
+            for line_index, line in enumerate(lines):
+                draw.text(
+                    (size[0] // 2, size[1] - SUBTITLE_OUTLINE_WIDTH - (len(lines) - 1 - line_index) * line_height),
+                    line,
+                    font=font,
+                    fill='white',
+                    anchor='md',
+                    stroke_width=stroke_width,
+                    stroke_fill=stroke_fill
+                )
+        
+        image_name = f"sub_{index:04d}.png"
+        image.save(os.path.join(output_dir, image_name), compress_level=1)
+        entries.append(f"file {image_name}\nduration {end_time - start_time:.3f}\n")
+        current_time = end_time
+    
+    # The concat demuxer only honours the last duration if another file follows
+    entries.append("file sub_blank.png\n")
     
-    # Split script into sentences
-    sentences = re.split(r'(?<=[.!?])\s+', script)
-    sentences = [s.strip() for s in sentences if s.strip()]
+    overlay_path = os.path.join(output_dir, "subtitles.txt")
+    with open(overlay_path, 'w', encoding='utf-8') as f:
+        f.writelines(entries)
     
-    if not sentences:
-        sentences = [script]
+    return overlay_path
+
+
+def _write_srt(chunks: list, output_dir: str) -> str:
+    """Write subtitle chunks as an SRT file for muxing as a soft subtitle track."""
+    srt_path = os.path.join(output_dir, "subtitles.srt")
     
-    # Calculate time per sentence
-    time_per_sentence = audio_duration / len(sentences)
+    lines = []
+    for index, (start_time, end_time, chunk_text) in enumerate(chunks, start=1):
+        lines.append(f"{index}\n{format_srt_time(start_time)} --> {format_srt_time(end_time)}\n{chunk_text.upper()}\n\n")
     
-    # ASS Header
-    ass_content = f"""[Script Info]
-Title: Reddit Story Subtitles
-ScriptType: v4.00+
-PlayResX: 1080
-PlayResY: 1920
-WrapStyle: 0
+    with open(srt_path, 'w', encoding='utf-8') as f:
+        f.writelines(lines)
+    
+    return srt_path
 
-[V4+ Styles]
-Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding
-Style: Default,{SUBTITLE_FONT},{SUBTITLE_FONTSIZE},{SUBTITLE_PRIMARY_COLOR},&H000000FF,{SUBTITLE_OUTLINE_COLOR},&H00000000,-1,0,0,0,100,100,0,0,1,{SUBTITLE_OUTLINE_WIDTH},0,2,50,50,250,1
 
-[Events]
-Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
-"""
+def generate_subtitles_from_script(script: str, audio_duration: float, output_dir: str,
+                                   word_timings: list = None, soft_subs: bool = False) -> tuple:
+    """Generate subtitles, timed from Edge TTS word boundaries when available.
     
-    current_time = 0.0
-    for sentence in sentences:
-        # Split long sentences into chunks of 6-8 words
-        words = sentence.split()
-        chunk_size = 6
-        
-        sentence_duration = time_per_sentence
-        time_per_chunk = sentence_duration / max(1, len(words) / chunk_size)
+    Returns the ASS file path and the pre-rendered PNG overlay list (or None),
+    or with soft_subs the SRT file path and None.
+    """
+    ass_path = os.path.join(output_dir, "subtitles.ass")
+    
+    if word_timings:
+        chunks = _chunks_from_word_timings(word_timings, audio_duration)
+    else:
+        chunks = _chunks_from_script(script, audio_duration)
+    
+    if soft_subs:
+        return _write_srt(chunks, output_dir), None
+    
+    lines = [ASS_HEADER]
+    
+    for start_time, end_time, chunk_text in chunks:
+        start_str = format_ass_time(start_time)
+        end_str = format_ass_time(end_time)
         
-        for i in range(0, len(words), chunk_size):
-            chunk_words = words[i:i + chunk_size]
-            chunk_text = ' '.join(chunk_words)
-            
-            start_str = format_ass_time(current_time)
-            end_time = min(current_time + time_per_chunk, audio_duration)
-            end_str = format_ass_time(end_time)
-            
-            # Clean and format text
-            clean_text = chunk_text.upper().replace('\\', '').replace('{', '').replace('}', '')
-            if clean_text:
-                ass_content += f"Dialogue: 0,{start_str},{end_str},Default,,0,0,0,,{clean_text}\n"
-            
-            current_time = end_time
+        # Clean and format text
+        clean_text = chunk_text.upper().translate(_ASS_STRIP_TABLE)
+        if clean_text:
+            lines.append(f"Dialogue: 0,{start_str},{end_str},Default,,0,0,0,,{clean_text}\n")
     
     with open(ass_path, 'w', encoding='utf-8') as f:
-        f.write(ass_content)
+        f.writelines(lines)
     
-    return ass_path
+    overlay_path = render_subtitle_overlays(chunks, output_dir)
+    return ass_path, overlay_path
 
 
 def format_ass_time(seconds: float) -> str:
     """Format seconds to ASS time format (H:MM:SS.CC)."""
-    hours = int(seconds // 3600)
-    minutes = int((seconds % 3600) // 60)
-    secs = seconds % 60
-    return f"{hours}:{minutes:02d}:{secs:05.2f}"
+    # Work in whole centiseconds so rounding can never produce "60.00" seconds
+    cs = round(seconds * 100)
+    return f"{cs // 360000}:{cs // 6000 % 60:02d}:{cs // 100 % 60:02d}.{cs % 100:02d}"
+
 
+def format_srt_time(seconds: float) -> str:
+    """Format seconds to SRT time format (HH:MM:SS,mmm)."""
+    ms = round(seconds * 1000)
+    return f"{ms // 3600000:02d}:{ms // 60000 % 60:02d}:{ms // 1000 % 60:02d},{ms % 1000:03d}"
 
-def render_video(audio_path: str, video_path: str, subtitle_path: str, output_path: str, duration: float):
-    """Render the final vertical video using FFmpeg."""
+
+def _probe_encoder(encoder: str) -> bool:
+    """Check whether FFmpeg can actually encode H.264 with the given hardware encoder."""
+    result = subprocess.run(['ffmpeg', '-hide_banner', '-encoders'], capture_output=True, text=True)
+    if encoder not in result.stdout:
+        return False
+    
+    if encoder == 'h264_vaapi':
+        if not os.path.exists(VAAPI_DEVICE):
+            return False
+        device_args = ['-vaapi_device', VAAPI_DEVICE]
+        upload_args = ['-vf', 'format=nv12,hwupload']
+    else:
+        device_args = []
+        upload_args = []
+    
+    # Most FFmpeg builds list hardware encoders even without the hardware, so try a tiny encode
+    cmd = [
+        'ffmpeg', '-hide_banner', '-loglevel', 'error',
+        *device_args,
+        '-f', 'lavfi', '-i', 'color=black:s=256x256:d=0.1',
+        *upload_args,
+        '-c:v', encoder,
+        '-f', 'null', '-'
+    ]
+    result = subprocess.run(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return result.returncode == 0
+
+
+@functools.lru_cache(maxsize=None)
+def _check_encoder_available(encoder: str) -> bool:
+    """Check for a hardware encoder once per process, reusing a previous success from disk when possible."""
+    ffmpeg_path = shutil.which('ffmpeg')
+    if not ffmpeg_path:
+        return False
+    
+    # Cached results are only valid for the FFmpeg binary they were probed with,
+    # and a VAAPI result only for the device it was probed on
+    cache_key = f"{ffmpeg_path}:{os.path.getmtime(ffmpeg_path)}"
+    probe_key = f"{encoder}:{VAAPI_DEVICE}" if encoder == 'h264_vaapi' else encoder
+    working = []
+    try:
+        with open(HWENC_CACHE_PATH) as f:
+            cache = json.load(f)
+        if cache.get('key') == cache_key:
+            working = cache['encoders']
+    except (OSError, ValueError, KeyError):
+        pass
+    
+    if probe_key in working:
+        return True
+    
+    # Failures aren't persisted, they may be transient (driver not loaded yet,
+    # NVENC session limit reached) and are probed again on the next run
+    if not _probe_encoder(encoder):
+        return False
+    
+    try:
+        os.makedirs(os.path.dirname(HWENC_CACHE_PATH), exist_ok=True)
+        with open(HWENC_CACHE_PATH, 'w') as f:
+            json.dump({'key': cache_key, 'encoders': working + [probe_key]}, f)
+    except OSError:
+        pass
+    
+    return True
+
+
+def _select_hw_encoder() -> str:
+    """Pick the hardware encoder to try first according to RENDER_HWACCEL, or None for CPU only."""
+    candidates = {
+        'auto': ['h264_nvenc', 'h264_vaapi'],
+        'nvenc': ['h264_nvenc'],
+        'vaapi': ['h264_vaapi'],
+        'cpu': [],
+    }
+    if RENDER_HWACCEL not in candidates:
+        print(f"  Unknown RENDER_HWACCEL={RENDER_HWACCEL!r}, using auto")
+    
+    for encoder in candidates.get(RENDER_HWACCEL, candidates['auto']):
+        if _check_encoder_available(encoder):
+            return encoder
+    return None
+
+
+def render_video(audio_data: bytes, video_path: str, subtitle_path: str, output_path: str, duration: float,
+                 overlay_path: str = None, soft_subs: bool = False):
+    """Render the final vertical video using FFmpeg.
+    
+    With soft_subs, subtitle_path is an SRT file muxed as a mov_text track instead of burned in.
+    """
     print("\n  Rendering final video...")
     
     # Get video dimensions for smart cropping
-    width, height = get_video_dimensions(video_path)
-    print(f"  Source video: {width}x{height}")
+    media_info = probe_media(video_path)
+    width, height = media_info['width'], media_info['height']
+    print(f"  Source video: {width}x{height}, {media_info['duration']:.1f}s")
     
     # Calculate crop for 9:16 aspect ratio
     target_ratio = 9 / 16
     source_ratio = width / height
-    
-    if source_ratio > target_ratio:
-        new_width = int(height * target_ratio)
-        crop_filter = f"crop={new_width}:{height}"
+    x264_args = X264_ARGS
+    
+    if abs(source_ratio - target_ratio) <= target_ratio * 0.01 and height >= 1920:
+        # Already vertical full HD, so there is nothing to crop and the
+        # re-encode (needed for the subtitles) can be fast and near-lossless
+        print("  Source is already 9:16, skipping crop")
+        crop_filter = None
+        crop_width, crop_height = width, height
+        scaled_width, scaled_height = 1080, 1920
+        x264_args = X264_PASSTHROUGH_ARGS
+    elif source_ratio > target_ratio:
+        crop_width, crop_height = int(height * target_ratio), height
+        crop_filter = f"crop={crop_width}:{crop_height}"
+        # Size the whole frame has to be scaled to for a centre crop of exactly 1080x1920
+        scaled_width, scaled_height = round(width * 1920 / height / 2) * 2, 1920
+    else:
+        crop_width, crop_height = width, int(width / target_ratio)
+        crop_filter = f"crop={crop_width}:{crop_height}"
+        scaled_width, scaled_height = 1080, round(height * 1080 / width / 2) * 2
+    
+    # Loop the background a known number of times through the concat demuxer
+    # rather than -stream_loop -1, and not at all when it already covers the audio.
+    # The input-side -t stops demuxing and decoding as soon as the audio is covered.
+    source_duration = media_info['duration']
+    if source_duration <= 0:
+        video_inputs = ['-stream_loop', '-1', '-t', str(duration), '-i', video_path]
+    elif duration > source_duration:
+        loops = math.ceil(duration / source_duration)
+        print(f"  Looping background {loops}x to cover {duration:.1f}s of audio")
+        loop_list_path = os.path.splitext(video_path)[0] + "_loop.txt"
+        escaped_name = os.path.basename(video_path).replace("'", "'\\''")
+        with open(loop_list_path, 'w', encoding='utf-8') as f:
+            f.write("ffconcat version 1.0\n" + f"file '{escaped_name}'\n" * loops)
+        video_inputs = ['-f', 'concat', '-safe', '0', '-t', str(duration), '-i', loop_list_path]
+    else:
+        video_inputs = ['-t', str(duration), '-i', video_path]
+    
+    # Overlay the pre-rendered subtitle strips when available, since libass
+    # would otherwise shape and rasterize the text again on every frame
+    subtitle_output_args = []
+    if soft_subs:
+        subtitle_inputs = ['-i', subtitle_path]
+        subtitle_filter = ""
+        subtitle_output_args = ['-map', '2:s', '-c:s', 'mov_text']
+    elif overlay_path:
+        subtitle_inputs = ['-f', 'concat', '-safe', '0', '-i', overlay_path]
+        subtitle_filter = f"[bg];[bg][2:v]overlay=0:{SUBTITLE_OVERLAY_Y}"
+    else:
+        # Escape subtitle path for FFmpeg's filter option parser
+        sub_path_escaped = subtitle_path.replace('\\', '/').replace(':', '\\:').replace("'", "\\'")
+        subtitle_inputs = []
+        subtitle_filter = f",ass='{sub_path_escaped}'"
+    
+    cpu_filters = ",".join(filter(None, [crop_filter, "scale=1080:1920", "setsar=1"]))
+    # With nothing to crop or burn in, hardware frames never need to leave the GPU
+    gpu_only = soft_subs and crop_filter is None
+    # Scaling the uncropped frame on the GPU only pays off when it shrinks it;
+    # otherwise frames come down at their decoded size and are cropped before the
+    # upscale, so no more than a decoded frame ever crosses the bus
+    gpu_downscale = scaled_width <= width and scaled_height <= height
+    
+    # Try the hardware pipeline first and fall back to libx264 if it fails
+    hw_encoder = _select_hw_encoder()
+    encoders = []
+    if (RENDER_ALLOW_COPY and soft_subs and (width, height) == (1080, 1920)
+            and media_info['codec'] == 'h264'):
+        # Nothing to crop, scale or burn in, so the background only needs re-muxing
+        print("  Source is already 1080x1920 H.264, copying video stream")
+        encoders.append(('copy', [], None, ['-c:v', 'copy']))
+    if hw_encoder == 'h264_nvenc':
+        # Decode and scale on the GPU; frames only come down for the subtitle burn-in
+        input_args = ['-hwaccel', 'cuda', '-hwaccel_output_format', 'cuda']
+        cuvid_decoder = CUVID_DECODERS.get(media_info['codec'])
+        if gpu_only:
+            filter_graph = "[0:v]scale_cuda=1080:1920,setsar=1[v]"
+        elif cuvid_decoder:
+            # The cuvid decoder crops and resizes itself, so only 1080x1920 frames come down
+            crop_left, crop_top = (width - crop_width) // 2, (height - crop_height) // 2
+            input_args += [
+                '-c:v', cuvid_decoder,
+                '-crop', f"{crop_top}x{height - crop_height - crop_top}x{crop_left}x{width - crop_width - crop_left}",
+                '-resize', '1080x1920'
+            ]
+            filter_graph = f"[0:v]hwdownload,format=nv12,setsar=1{subtitle_filter},hwupload_cuda[v]"
+        elif gpu_downscale:
+            filter_graph = (
+                f"[0:v]scale_cuda={scaled_width}:{scaled_height},hwdownload,format=nv12,"
+                f"crop=1080:1920,setsar=1{subtitle_filter},hwupload_cuda[v]"
+            )
+        else:
+            filter_graph = f"[0:v]hwdownload,format=nv12,{cpu_filters}{subtitle_filter},hwupload_cuda[v]"
+        encoders.append(('h264_nvenc', input_args, filter_graph, NVENC_ARGS))
+    elif hw_encoder == 'h264_vaapi':
+        # Same shape as the CUDA pipeline without a cropping decoder: download
+        # for the crop and subtitles, then upload the finished frame to the encoder.
+        # scale_vaapi only ever shrinks, so it never needs a surface larger than the source.
+        if gpu_only:
+            filter_graph = "[0:v]scale_vaapi=w=1080:h=1920,setsar=1[v]"
+        elif gpu_downscale:
+            filter_graph = (
+                f"[0:v]scale_vaapi=w={scaled_width}:h={scaled_height},hwdownload,format=nv12,"
+                f"crop=1080:1920,setsar=1{subtitle_filter},format=nv12,hwupload[v]"
+            )
+        else:
+            filter_graph = f"[0:v]hwdownload,format=nv12,{cpu_filters}{subtitle_filter},format=nv12,hwupload[v]"
+        encoders.append((
+            'h264_vaapi',
+            [
+                '-init_hw_device', f'vaapi=va:{VAAPI_DEVICE}', '-filter_hw_device', 'va',
+                '-hwaccel', 'vaapi', '-hwaccel_device', 'va', '-hwaccel_output_format', 'vaapi'
+            ],
+            filter_graph,
+            VAAPI_ARGS
+        ))
+    encoders.append((
+        'libx264',
+        [],
+        f"[0:v]{cpu_filters}{subtitle_filter}[v]",
+        x264_args
+    ))
+    
+    for encoder, input_args, filter_graph, codec_args in encoders:
+        if filter_graph is None:
+            video_map_args = ['-map', '0:v']
+        else:
+            # Pass the graph as a script file so it never goes through argument quoting
+            filter_script_path = os.path.join(os.path.dirname(output_path), f"filter_{encoder}.txt")
+            with open(filter_script_path, 'w', encoding='utf-8') as f:
+                f.write(filter_graph)
+            video_map_args = ['-filter_complex_script', filter_script_path, '-map', '[v]']
+        
+        cmd = [
+            'ffmpeg', '-y', '-hide_banner', '-loglevel', 'error',
+            *input_args,
+            *video_inputs,
+            '-f', 'mp3', '-i', 'pipe:0',
+            *subtitle_inputs,
+            *video_map_args,
+            '-map', '1:a',
+            *subtitle_output_args,
+            '-t', str(duration),
+            *codec_args,
+            *AUDIO_ARGS,
+            '-movflags', '+faststart',
+            output_path
+        ]
+        
+        # The voiceover is piped in on stdin, it never touches the disk; stderr stays
+        # as bytes and is only decoded if the attempt fails
+        print(f"  Running FFmpeg ({encoder})...")
+        result = subprocess.run(cmd, input=audio_data, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        
+        if result.returncode == 0:
+            break
+        
+        print(f"  FFmpeg Error ({encoder}): {result.stderr.decode(errors='replace')}")
     else:
-        new_height = int(width / target_ratio)
-        crop_filter = f"crop={width}:{new_height}"
-    
-    # Escape subtitle path for FFmpeg
-    sub_path_escaped = subtitle_path.replace('\\', '/').replace(':', '\\:').replace("'", "\\'")
-    
-    # FFmpeg command
-    cmd = [
-        'ffmpeg', '-y',
-        '-stream_loop', '-1',
-        '-i', video_path,
-        '-i', audio_path,
-        '-filter_complex',
-        f"[0:v]{crop_filter},scale=1080:1920,setsar=1,ass='{sub_path_escaped}'[v]",
-        '-map', '[v]',
-        '-map', '1:a',
-        '-t', str(duration),
-        '-c:v', 'libx264',
-        '-preset', 'fast',
-        '-crf', '23',
-        '-c:a', 'aac',
-        '-b:a', '192k',
-        '-movflags', '+faststart',
-        output_path
-    ]
-    
-    print(f"  Running FFmpeg...")
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    
-    if result.returncode != 0:
-        print(f"  FFmpeg Error: {result.stderr}")
         raise RuntimeError("FFmpeg failed")
     
     size_mb = os.path.getsize(output_path) / (1024 * 1024)
@@ -388,72 +850,166 @@ def render_video(audio_path: str, video_path: str, subtitle_path: str, output_pa
     return output_path
 
 
-async def main_async(payload):
-    """Async main function for edge-tts."""
+def print_short_banner(payload: dict):
+    """Print the header that the rest of a short's render log appears under."""
     print("=" * 60)
     print("REDDIT SHORTS VIDEO RENDERER (FREE)")
     print("=" * 60)
-    print(f"Title: {payload['story_title']}")
+    print(f"Title: {payload.get('story_title', '')}")
     print(f"Video: {payload.get('video_name', 'gameplay')}")
-    
-    with tempfile.TemporaryDirectory() as temp_dir:
-        temp_path = Path(temp_dir)
-        
-        # Generate TTS using Edge TTS (FREE!)
-        print("\n[1/5] Generating voiceover with Edge TTS (FREE)...")
-        audio_path = str(temp_path / "audio.mp3")
-        await generate_tts(payload['script'], audio_path)
-        
-        # Get audio duration
-        duration = get_audio_duration(audio_path)
-        print(f"  Audio duration: {duration:.1f} seconds")
-        
-        # Download video from Google Drive or direct URL
-        print("\n[2/5] Downloading background video...")
-        video_path = str(temp_path / "background.mp4")
-        video_path = download_video(payload['video_url'], video_path)
-        
-        # Generate subtitles from script
-        print("\n[3/5] Generating subtitles...")
-        script = payload.get('script', 'Story content')
-        subtitle_path = generate_subtitles_from_script(script, duration, str(temp_path))
-        print(f"  Created: {subtitle_path}")
-        
-        # Render final video
-        print("\n[4/5] Rendering final video...")
-        safe_title = ''.join(c for c in payload['story_title'][:30] if c.isalnum() or c == ' ').replace(' ', '_')
-        output_filename = f"short_{safe_title}_{payload['timestamp']}.mp4"
-        output_path = str(temp_path / output_filename)
-        
-        render_video(audio_path, video_path, subtitle_path, output_path, duration)
-        
-        # Upload to Google Drive using rclone
-        print("\n[5/5] Uploading to Google Drive...")
-        download_url = upload_to_gdrive(output_path)
-        
-        print("\n" + "=" * 60)
-        print("SUCCESS!")
-        print("=" * 60)
-        print(f"Filename: {output_filename}")
-        print(f"Download URL: {download_url}")
-        
-        # Set GitHub Actions outputs for n8n callback
+
+
+async def prepare_short(payload: dict, temp_path: Path, label: str) -> tuple:
+    """Voice a short and download its background, returning the audio, word timings and video path.
+    
+    In a batch this overlaps the previous short's render, so every line is tagged with label.
+    """
+    def log(message: str, **kwargs):
+        print(f"[{label}] {message.strip()}", **kwargs)
+    
+    # Generate TTS using Edge TTS (FREE!) while the background video downloads,
+    # the two steps don't depend on each other
+    log("[1/5] Generating voiceover with Edge TTS (FREE)...")
+    log("[2/5] Downloading background video...")
+    video_path = str(temp_path / "background.mp4")
+    (audio_data, word_timings), video_path = await asyncio.gather(
+        generate_tts(payload['script'], log),
+        asyncio.to_thread(download_video, payload['video_url'], video_path, log)
+    )
+    return audio_data, word_timings, video_path
+
+
+async def finish_short(payload: dict, temp_path: Path, prepared: tuple, soft_subs: bool = False) -> dict:
+    """Subtitle, render and upload a prepared short, returning its filename, download URL and title."""
+    audio_data, word_timings, video_path = prepared
+    
+    # Get audio duration
+    duration = get_audio_duration(audio_data, word_timings)
+    print(f"  Audio duration: {duration:.1f} seconds")
+    
+    # Generate subtitles from script
+    print("\n[3/5] Generating subtitles...")
+    script = payload.get('script', 'Story content')
+    subtitle_path, overlay_path = generate_subtitles_from_script(
+        script, duration, str(temp_path), word_timings, soft_subs
+    )
+    print(f"  Created: {subtitle_path}")
+    if overlay_path:
+        print(f"  Pre-rendered overlays: {overlay_path}")
+    
+    # Render final video
+    print("\n[4/5] Rendering final video...")
+    safe_title = ''.join(c for c in payload['story_title'][:30] if c.isalnum() or c == ' ').replace(' ', '_')
+    output_filename = f"short_{safe_title}_{payload['timestamp']}.mp4"
+    output_path = str(temp_path / output_filename)
+    
+    # FFmpeg and rclone run in threads so the next short in a batch can be
+    # voiced and downloaded on the event loop in the meantime
+    await asyncio.to_thread(
+        render_video, audio_data, video_path, subtitle_path, output_path, duration, overlay_path, soft_subs
+    )
+    
+    # Upload to Google Drive using rclone
+    print("\n[5/5] Uploading to Google Drive...")
+    download_url = await asyncio.to_thread(upload_to_gdrive, output_path)
+    
+    print("\n" + "=" * 60)
+    print("SUCCESS!")
+    print("=" * 60)
+    print(f"Filename: {output_filename}")
+    print(f"Download URL: {download_url}")
+    
+    return {
+        'filename': output_filename,
+        'download_url': download_url,
+        'title': payload['story_title'],
+    }
+
+
+async def main_async(payload, soft_subs: bool = False):
+    """Async main function for edge-tts.
+    
+    Accepts a single payload, a list of payloads, or {"items": [...]} (the form
+    repository_dispatch allows), rendering a batch in one process so the
+    interpreter, HTTP session and encoder probe are only set up once. A failed
+    short is recorded in the results instead of aborting the rest of the batch.
+    """
+    if isinstance(payload, dict) and 'items' in payload:
+        payloads = payload['items']
+    elif isinstance(payload, list):
+        payloads = payload
+    else:
+        payloads = [payload]
+    
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            def start_preparing(index):
+                # Each short gets its own working directory, removed once it's uploaded
+                item_path = Path(temp_dir) / str(index)
+                item_path.mkdir()
+                label = f"Short {index + 1}/{len(payloads)}"
+                return asyncio.create_task(prepare_short(payloads[index], item_path, label))
+            
+            pending = start_preparing(0) if payloads else None
+            try:
+                for index, item in enumerate(payloads):
+                    item_path = Path(temp_dir) / str(index)
+                    # Only this short's untagged output follows its header
+                    if len(payloads) > 1:
+                        print(f"\n### Short {index + 1}/{len(payloads)} ###")
+                    print_short_banner(item)
+                    try:
+                        try:
+                            prepared = await pending
+                        finally:
+                            # Voice and download the next short while this one renders and uploads
+                            pending = start_preparing(index + 1) if index + 1 < len(payloads) else None
+                        result = await finish_short(item, item_path, prepared, soft_subs)
+                        results.append({'status': 'success', **result})
+                    except Exception as e:
+                        traceback.print_exc()
+                        print(f"\n  Short {index + 1} failed: {e}")
+                        results.append({'status': 'failed', 'title': item.get('story_title', ''), 'error': str(e)})
+                    finally:
+                        shutil.rmtree(item_path, ignore_errors=True)
+            finally:
+                if pending:
+                    pending.cancel()
+    finally:
+        # Set GitHub Actions outputs for n8n callback, including any shorts
+        # uploaded before a failure so a retry doesn't duplicate them
         if os.environ.get('GITHUB_OUTPUT'):
             with open(os.environ['GITHUB_OUTPUT'], 'a') as f:
-                f.write(f"filename={output_filename}\n")
-                f.write(f"download_url={download_url}\n")
-                f.write(f"title={payload['story_title']}\n")
-        
-        return download_url
+                if len(results) == 1 and results[0]['status'] == 'success':
+                    f.write(f"filename={results[0]['filename']}\n")
+                    f.write(f"download_url={results[0]['download_url']}\n")
+                    f.write(f"title={results[0]['title']}\n")
+                f.write(f"results={json.dumps(results)}\n")
+    
+    return results
 
 
 def main():
     parser = argparse.ArgumentParser(description='Render Reddit story as vertical short')
-    parser.add_argument('--payload', required=True, help='JSON payload from n8n')
+    payload_group = parser.add_mutually_exclusive_group(required=True)
+    payload_group.add_argument('--payload', help='JSON payload from n8n (one short or a list)')
+    payload_group.add_argument('--payload-file', help='File containing the JSON payload, for batches too large for argv')
+    parser.add_argument('--soft-subs', action='store_true',
+                        help='Mux subtitles as a selectable track instead of burning them in')
     args = parser.parse_args()
     
-    payload = json.loads(args.payload)
-    asyncio.run(main_async(payload))
+    if args.payload_file:
+        with open(args.payload_file, encoding='utf-8') as f:
+            payload = json.load(f)
+    else:
+        payload = json.loads(args.payload)
+    results = asyncio.run(main_async(payload, args.soft_subs))
+    
+    failed = sum(result['status'] != 'success' for result in results)
+    if failed:
+        print(f"\n{failed} of {len(results)} shorts failed")
+        sys.exit(1)
 
 
 if __name__ == '__main__':